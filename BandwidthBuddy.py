@@ -1,14 +1,22 @@
 import sys
 import psutil
 import time
+import math
 import sqlite3
-from datetime import datetime
+import csv
+from datetime import datetime, timedelta, timezone
 import threading
+from collections import deque
+import multiprocessing
+import pickle
+from concurrent.futures import ProcessPoolExecutor, CancelledError
+from concurrent.futures.process import BrokenProcessPool
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                              QTableWidget, QTableWidgetItem, QPushButton, QComboBox, 
                              QTabWidget, QMenuBar, QMenu, QDialog, QFormLayout, QLineEdit, 
-                             QSpinBox, QMessageBox, QToolBar, QDateEdit, QCheckBox, QLabel)
-from PyQt6.QtCore import Qt, QTimer, QCoreApplication, QLocale, QTranslator, QDate
+                             QSpinBox, QMessageBox, QToolBar, QDateEdit, QCheckBox, QLabel,
+                             QFileDialog)
+from PyQt6.QtCore import Qt, QTimer, QCoreApplication, QLocale, QTranslator, QDate, QEvent
 from PyQt6.QtGui import QAction, QActionGroup, QColor, QPalette, QIcon
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
@@ -17,12 +25,54 @@ import numpy as np
 import qdarkstyle
 from qdarkstyle import load_stylesheet
 import os
+import shutil
 from matplotlib.dates import DateFormatter
+from matplotlib.figure import Figure
+import history_worker
+from history_worker import merge_history_partials
+
+# Data location; override with BANDWIDTHBUDDY_DATA_DIR
+def get_data_dir():
+    data_dir = os.environ.get("BANDWIDTHBUDDY_DATA_DIR")
+    if not data_dir:
+        if sys.platform == "win32":
+            base = os.environ.get("APPDATA", os.path.expanduser("~"))
+        elif sys.platform == "darwin":
+            base = os.path.expanduser("~/Library/Application Support")
+        else:
+            base = os.environ.get("XDG_DATA_HOME", os.path.expanduser("~/.local/share"))
+        data_dir = os.path.join(base, "BandwidthBuddy")
+    data_dir = os.path.abspath(os.path.expanduser(data_dir))
+    os.makedirs(data_dir, exist_ok=True)
+    return data_dir
+
+DB_PATH = os.path.join(get_data_dir(), "bandwidth_buddy.db")
+LEGACY_DB_PATH = os.path.abspath("bandwidth_buddy.db")
+RETENTION_DAYS = int(os.environ.get("BANDWIDTHBUDDY_RETENTION_DAYS", "0"))
+IDLE_SECONDS = 30
+TICK_GAP_SECONDS = 0.5
+PLOT_HISTORY = 3600
+
+# Older versions kept the database in the working directory; carry it over on first run
+def migrate_legacy_db():
+    if os.path.exists(DB_PATH) or not os.path.exists(LEGACY_DB_PATH):
+        return
+    for suffix in ("", "-journal", "-wal", "-shm"):
+        if os.path.exists(LEGACY_DB_PATH + suffix):
+            shutil.move(LEGACY_DB_PATH + suffix, DB_PATH + suffix)
+    print(f"Moved {LEGACY_DB_PATH} to {DB_PATH}")
 
 # Database setup
 def init_db():
-    conn = sqlite3.connect("bandwidth_buddy.db")
+    migrate_legacy_db()
+    conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
+    # auto_vacuum is free to set before the first table exists; older databases are
+    # converted by DatabaseMaintenance.upgrade off the GUI thread
+    new_db = cursor.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0] == 0
+    if new_db:
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    cursor.execute("PRAGMA journal_mode = WAL")
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS bandwidth_usage (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -39,9 +89,149 @@ def init_db():
             max_upload_kbps INTEGER
         )
     """)
+    if new_db:
+        cursor.execute("CREATE INDEX idx_bandwidth_usage_timestamp ON bandwidth_usage (timestamp)")
     conn.commit()
     conn.close()
 
+# Database maintenance: WAL checkpoints, retention pruning and incremental vacuum
+class DatabaseMaintenance:
+    def __init__(self, db_path, retention_days=RETENTION_DAYS, interval=60, batch_size=500,
+                 batch_pause=0.05, vacuum_pages=256, is_idle=None):
+        self.db_path = db_path
+        self.retention_days = retention_days
+        self.interval = interval
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.vacuum_pages = vacuum_pages
+        self.is_idle = is_idle or (lambda: True)
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.wake_event = threading.Event()
+        self.full_requested = threading.Event()
+        self.full_done = threading.Event()
+        self.upgrade_pending = False
+        self.upgrade_done = threading.Event()
+        self.last_run = None
+        self.last_pruned = 0
+        self.last_error = None
+
+    def start(self):
+        self.upgrade_pending = self.needs_upgrade()
+        self.thread = threading.Thread(target=self.run_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.wake_event.set()
+
+    def request_full(self):
+        # Picked up by the maintenance thread; full_done is set once the pass finishes
+        self.full_done.clear()
+        self.full_requested.set()
+        self.wake_event.set()
+
+    def needs_upgrade(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+            index = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_bandwidth_usage_timestamp'"
+            ).fetchone()
+        finally:
+            conn.close()
+        return auto_vacuum != 2 or index is None
+
+    def upgrade(self):
+        # Databases from older versions lack the timestamp index and incremental auto_vacuum;
+        # both rewrite the whole file, so they run here rather than in init_db
+        with self.lock:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            try:
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_bandwidth_usage_timestamp ON bandwidth_usage (timestamp)")
+                conn.commit()
+                if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                    conn.execute("VACUUM")
+            finally:
+                conn.close()
+
+    def run_loop(self):
+        if self.upgrade_pending:
+            try:
+                self.upgrade()
+                self.last_error = None
+            except sqlite3.Error as e:
+                self.last_error = e
+            self.upgrade_done.set()
+        while not self.stop_event.is_set():
+            self.wake_event.wait(self.interval)
+            self.wake_event.clear()
+            if self.stop_event.is_set():
+                break
+            full = self.full_requested.is_set()
+            if not full and not self.is_idle():
+                continue
+            self.full_requested.clear()
+            try:
+                self.run_once(full=full)
+                self.last_error = None
+            except sqlite3.Error as e:
+                # Keep the thread alive; a locked database is retried on the next pass
+                self.last_error = e
+            if full:
+                self.full_done.set()
+
+    def run_once(self, full=False):
+        with self.lock:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            try:
+                self.last_pruned = self.prune(conn)
+                # incremental_vacuum(0) releases every free page; executescript steps it to completion
+                conn.executescript(f"PRAGMA incremental_vacuum({0 if full else self.vacuum_pages});")
+                # PASSIVE never waits on the collector; TRUNCATE also shrinks the WAL file
+                conn.execute(f"PRAGMA wal_checkpoint({'TRUNCATE' if full else 'PASSIVE'})").fetchall()
+            finally:
+                conn.close()
+            self.last_run = datetime.now()
+            return self.last_pruned
+
+    def prune(self, conn):
+        if self.retention_days <= 0:
+            return 0
+        cutoff = datetime.now() - timedelta(days=self.retention_days)
+        pruned = 0
+        # Small batches in separate transactions keep the collector's inserts from blocking
+        while not self.stop_event.is_set():
+            cursor = conn.execute("""
+                DELETE FROM bandwidth_usage WHERE id IN (
+                    SELECT id FROM bandwidth_usage WHERE timestamp < ? LIMIT ?
+                )
+            """, (cutoff, self.batch_size))
+            conn.commit()
+            pruned += cursor.rowcount
+            if cursor.rowcount < self.batch_size:
+                break
+            time.sleep(self.batch_pause)
+        return pruned
+
+    def stats(self):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        page_size = cursor.execute("PRAGMA page_size").fetchone()[0]
+        page_count = cursor.execute("PRAGMA page_count").fetchone()[0]
+        free_pages = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+        conn.close()
+        wal_path = self.db_path + "-wal"
+        return {
+            "db_size": os.path.getsize(self.db_path),
+            "wal_size": os.path.getsize(wal_path) if os.path.exists(wal_path) else 0,
+            "page_size": page_size,
+            "page_count": page_count,
+            "free_pages": free_pages,
+            "fragmentation": free_pages / page_count * 100 if page_count else 0.0
+        }
+
 # Translator for multi-language support
 class Translator:
     def __init__(self):
@@ -107,6 +297,634 @@ class ThemeManager:
             self.app.setStyleSheet("")
             self.app.setPalette(palette)
 
+# Space-Saving sketch: approximate top-K heavy hitters in fixed memory
+class SpaceSaving:
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        self.counts = {}
+
+    def add(self, key, amount):
+        # Returns the key evicted to make room, if any
+        if key in self.counts:
+            self.counts[key][0] += amount
+            return None
+        if len(self.counts) < self.capacity:
+            self.counts[key] = [amount, 0]
+            return None
+        evicted = min(self.counts, key=lambda k: self.counts[k][0])
+        min_count = self.counts.pop(evicted)[0]
+        self.counts[key] = [min_count + amount, min_count]
+        return evicted
+
+    def top(self, k=None):
+        items = sorted(self.counts.items(), key=lambda item: item[1][0], reverse=True)
+        return [(key, count, error) for key, (count, error) in items[:k]]
+
+# Streaming analytics: top talkers, per-app EWMA baselines and anomaly flags
+class TrafficAnalyzer:
+    def __init__(self, capacity=64, alpha=0.1, seasonal_alpha=0.01, z_threshold=3.0,
+                 seasonal_factor=3.0, warmup=10, seasonal_warmup=600, min_rate=1024):
+        # Baselines are only kept for apps tracked by the sketch, so memory is bounded by capacity
+        self.sketch = SpaceSaving(capacity)
+        self.baselines = {}
+        # Population baseline over every app's rate; the prior for apps entering the sketch
+        self.pooled = self.new_baseline()
+        self.alpha = alpha
+        self.seasonal_alpha = seasonal_alpha
+        self.z_threshold = z_threshold
+        self.seasonal_factor = seasonal_factor
+        self.warmup = warmup
+        self.seasonal_warmup = seasonal_warmup
+        self.min_rate = min_rate
+        self.last_timestamp = None
+        self.lock = threading.Lock()
+
+    def observe(self, previous, current, timestamp):
+        # Samples map a process key (pid) to (name, download, upload) cumulative counters.
+        # Diffing per process means a process starting or exiting doesn't look like traffic:
+        # a process's first sample counts as 0, and the deltas are then summed by name.
+        totals = {}
+        for key, (app, download, upload) in current.items():
+            total = totals.setdefault(app, [0, 0])
+            prev = previous.get(key)
+            if prev is None or prev[0] != app:
+                continue
+            total[0] += max(download - prev[1], 0)
+            total[1] += max(upload - prev[2], 0)
+        deltas = {app: (download, upload) for app, (download, upload) in totals.items()}
+        interval = 1.0
+        if self.last_timestamp is not None:
+            interval = max((timestamp - self.last_timestamp).total_seconds(), 0.001)
+        self.last_timestamp = timestamp
+        if not previous:
+            # Nothing to diff against yet; an all-zero tick would only skew the baselines
+            return deltas
+
+        hour = timestamp.hour
+        with self.lock:
+            for app, (download, upload) in deltas.items():
+                if download + upload > 0:
+                    evicted = self.sketch.add(app, download + upload)
+                    if evicted is not None:
+                        self.baselines.pop(evicted, None)
+            for app in self.sketch.counts:
+                download, upload = deltas.get(app, (0, 0))
+                self.update_baseline(app, (download + upload) / interval, hour)
+            # Folded in after scoring, so a new entrant is judged against the population before its spike
+            if deltas:
+                pooled_alpha = self.alpha / len(deltas)
+                pooled_seasonal_alpha = self.seasonal_alpha / len(deltas)
+                n, seasonal_n = self.pooled["n"], self.pooled["seasonal_n"][hour]
+                for download, upload in deltas.values():
+                    self.fold(self.pooled, (download + upload) / interval, hour,
+                              pooled_alpha, pooled_seasonal_alpha)
+                # The pooled sample counts are in ticks, so warmup means the same as for one app
+                self.pooled["n"] = n + 1
+                self.pooled["seasonal_n"][hour] = seasonal_n + 1
+        return deltas
+
+    def new_baseline(self):
+        return {"mean": 0.0, "var": 0.0, "n": 0, "rate": 0.0, "z": 0.0, "flags": [],
+                "seasonal": [0.0] * 24, "seasonal_n": [0] * 24}
+
+    def fold(self, baseline, rate, hour, alpha, seasonal_alpha):
+        diff = rate - baseline["mean"]
+        increment = alpha * diff
+        baseline["mean"] += increment
+        baseline["var"] = (1 - alpha) * (baseline["var"] + diff * increment)
+        baseline["n"] += 1
+        if baseline["seasonal_n"][hour] == 0:
+            baseline["seasonal"][hour] = rate
+        else:
+            baseline["seasonal"][hour] += seasonal_alpha * (rate - baseline["seasonal"][hour])
+        baseline["seasonal_n"][hour] += 1
+
+    def update_baseline(self, app, rate, hour):
+        baseline = self.baselines.get(app)
+        if baseline is None:
+            # Apps entering the sketch (new, previously quiet or evicted) start from the pooled prior
+            pooled = self.pooled
+            baseline = self.new_baseline()
+            baseline.update(mean=pooled["mean"], var=pooled["var"], n=pooled["n"],
+                            seasonal=list(pooled["seasonal"]), seasonal_n=list(pooled["seasonal_n"]))
+            self.baselines[app] = baseline
+
+        # Score the sample against the baseline before folding it in; min_rate is the noise floor
+        std = max(math.sqrt(baseline["var"]), self.min_rate)
+        z = (rate - baseline["mean"]) / std
+        flags = []
+        if rate >= self.min_rate:
+            if baseline["n"] >= self.warmup and z >= self.z_threshold:
+                flags.append("spike")
+            seasonal_mean = baseline["seasonal"][hour]
+            if (baseline["seasonal_n"][hour] >= self.seasonal_warmup
+                    and rate > self.seasonal_factor * max(seasonal_mean, self.min_rate)):
+                flags.append("seasonal")
+
+        self.fold(baseline, rate, hour, self.alpha, self.seasonal_alpha)
+        baseline["rate"] = rate
+        baseline["z"] = z
+        baseline["flags"] = flags
+
+    def snapshot(self, k=None):
+        with self.lock:
+            rows = []
+            for app, count, error in self.sketch.top(k):
+                baseline = self.baselines.get(app)
+                if baseline is None:
+                    continue
+                rows.append((app, count, error, baseline["rate"], baseline["mean"],
+                             baseline["z"], list(baseline["flags"])))
+            return rows
+
+    def anomalous_apps(self):
+        with self.lock:
+            return {app for app, baseline in self.baselines.items() if baseline["flags"]}
+
+# Connection-level collector: attributes per-app traffic to remote endpoints
+class ConnectionCollector:
+    def __init__(self, capacity=256, time_budget=0.05, max_backoff=30):
+        # Only (app, remote address, port) keys tracked by the sketch keep details
+        self.sketch = SpaceSaving(capacity)
+        self.details = {}
+        self.time_budget = time_budget
+        self.max_backoff = max_backoff
+        self.connections = {}
+        self.pid_names = {}
+        self.skip_ticks = 0
+        self.last_cost = 0.0
+        self.last_scan_cost = 0.0
+        self.enabled = False
+        self.lock = threading.Lock()
+
+    def observe(self, deltas):
+        if not self.enabled:
+            return
+        if self.skip_ticks > 0:
+            self.skip_ticks -= 1
+            return
+        start = time.perf_counter()
+        try:
+            connections = psutil.net_connections(kind="inet")
+        except (psutil.AccessDenied, OSError):
+            return
+        # The scan itself can't be interrupted; its cost only counts towards the backoff below
+        scanned = time.perf_counter()
+        self.last_scan_cost = scanned - start
+
+        # Incremental diff against the previous tick: only new sockets need a pid lookup
+        current = {}
+        truncated = False
+        for conn in connections:
+            if time.perf_counter() - scanned > self.time_budget:
+                truncated = True
+                break
+            if not conn.raddr or not conn.pid:
+                continue
+            key = (conn.pid, conn.laddr, conn.raddr)
+            endpoint = self.connections.get(key)
+            if endpoint is None:
+                name = self.pid_names.get(conn.pid)
+                if name is None:
+                    try:
+                        name = psutil.Process(conn.pid).name()
+                    except (psutil.NoSuchProcess, psutil.AccessDenied):
+                        continue
+                    self.pid_names[conn.pid] = name
+                endpoint = (name, conn.raddr.ip, conn.raddr.port)
+            current[key] = endpoint
+        if truncated:
+            # Sockets not reached this tick are kept until a full pass sees them closed
+            for key, endpoint in self.connections.items():
+                current.setdefault(key, endpoint)
+        else:
+            live_pids = {key[0] for key in current}
+            self.pid_names = {pid: name for pid, name in self.pid_names.items() if pid in live_pids}
+        self.connections = current
+
+        endpoints = {}
+        for endpoint in current.values():
+            endpoints.setdefault(endpoint[0], {}).setdefault(endpoint, 0)
+            endpoints[endpoint[0]][endpoint] += 1
+        with self.lock:
+            # Sockets carry no byte counters, so each app's delta is split across its connections
+            for app, app_endpoints in endpoints.items():
+                download, upload = deltas.get(app, (0, 0))
+                if download + upload <= 0:
+                    # Idle sockets must not evict endpoints that carried traffic; just refresh their counts
+                    for endpoint, count in app_endpoints.items():
+                        if endpoint in self.details:
+                            self.details[endpoint][2] = count
+                    continue
+                total_connections = sum(app_endpoints.values())
+                for endpoint, count in app_endpoints.items():
+                    share = count / total_connections
+                    evicted = self.sketch.add(endpoint, (download + upload) * share)
+                    if evicted is not None:
+                        self.details.pop(evicted, None)
+                    detail = self.details.setdefault(endpoint, [0.0, 0.0, 0])
+                    detail[0] += download * share
+                    detail[1] += upload * share
+                    detail[2] = count
+
+        self.last_cost = time.perf_counter() - start
+        if self.last_cost > self.time_budget:
+            # Skip enough ticks to keep the average cost per tick, scan included, within the budget
+            self.skip_ticks = min(math.ceil(self.last_cost / self.time_budget) - 1, self.max_backoff)
+
+    def snapshot(self, app_name):
+        with self.lock:
+            rows = []
+            for (app, address, port), count, error in self.sketch.top():
+                if app != app_name or (app, address, port) not in self.details:
+                    continue
+                download, upload, connections = self.details[(app, address, port)]
+                rows.append((address, port, download, upload, connections))
+            return rows
+
+# Replay sources: recorded rows grouped back into collector ticks
+def group_ticks(rows):
+    # The collector writes one burst of rows per tick, separated by its 1 s sleep.
+    # Rows carry no pid, so the n-th row of an app within a tick stands in for a process key;
+    # every process row holds the same NIC counter, so a shifted position still diffs correctly.
+    sample = {}
+    seen = {}
+    first = last = None
+    for app_name, download, upload, timestamp in rows:
+        if not isinstance(timestamp, datetime):
+            timestamp = datetime.fromisoformat(str(timestamp))
+        if last is not None and (timestamp - last).total_seconds() > TICK_GAP_SECONDS:
+            yield first, sample
+            sample = {}
+            seen = {}
+            first = None
+        if first is None:
+            first = timestamp
+        index = seen.get(app_name, 0)
+        seen[app_name] = index + 1
+        sample[(app_name, index)] = (app_name, download, upload)
+        last = timestamp
+    if sample:
+        yield first, sample
+
+def iter_db_ticks(db_path, date_from, date_to, batch_size=5000):
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT app_name, download_bytes, upload_bytes, timestamp
+            FROM bandwidth_usage
+            WHERE timestamp BETWEEN ? AND ?
+            ORDER BY id
+        """, (date_from, date_to))
+        rows = (row for batch in iter(lambda: cursor.fetchmany(batch_size), []) for row in batch)
+        yield from group_ticks(rows)
+    finally:
+        conn.close()
+
+def iter_csv_ticks(path):
+    # Reads files written by Export Report
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = ((row["Application"], float(row["Download (MB)"]) * 1024 * 1024,
+                 float(row["Upload (MB)"]) * 1024 * 1024, row["Timestamp"])
+                for row in csv.DictReader(f))
+        yield from group_ticks(rows)
+
+# Replay engine: feeds recorded ticks to a sink, faster than real time
+class ReplayEngine:
+    def __init__(self, ticks, sink, speed=60.0, max_gap=5.0):
+        # speed <= 0 replays as fast as possible; gaps longer than max_gap are shortened
+        self.ticks = ticks
+        self.sink = sink
+        self.speed = speed
+        self.max_gap = max_gap
+        self.ticks_played = 0
+        self.error = None
+        self.stop_event = threading.Event()
+        self.finished = threading.Event()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        previous = None
+        try:
+            for timestamp, sample in self.ticks:
+                if self.stop_event.is_set():
+                    break
+                if previous is not None and self.speed > 0:
+                    gap = min(max((timestamp - previous).total_seconds(), 0), self.max_gap)
+                    self.stop_event.wait(gap / self.speed)
+                self.sink(sample, timestamp)
+                previous = timestamp
+                self.ticks_played += 1
+        except (sqlite3.Error, OSError, ValueError, KeyError) as e:
+            self.error = e
+        finally:
+            self.finished.set()
+
+# Token-bucket shaper simulation for proposed limits
+class ShaperSimulation:
+    def __init__(self, limits, burst_seconds=1.0, queue_seconds=5.0):
+        # limits maps app -> (max_download_kbps, max_upload_kbps); falsy values are unlimited
+        self.limits = limits
+        self.burst_seconds = burst_seconds
+        self.queue_seconds = queue_seconds
+        self.buckets = {}
+        self.results = {}
+        self.last_timestamp = None
+        self.lock = threading.Lock()
+
+    def observe(self, deltas, timestamp):
+        interval = 1.0
+        if self.last_timestamp is not None:
+            interval = max((timestamp - self.last_timestamp).total_seconds(), 0.001)
+        self.last_timestamp = timestamp
+        with self.lock:
+            for app, (download, upload) in deltas.items():
+                limits = self.limits.get(app)
+                if not limits:
+                    continue
+                for direction, amount, kbps in (("download", download, limits[0]), ("upload", upload, limits[1])):
+                    if kbps:
+                        self.shape(app, direction, amount, kbps * 1000 / 8, interval)
+
+    def shape(self, app, direction, amount, rate, interval):
+        capacity = rate * self.burst_seconds
+        bucket = self.buckets.setdefault((app, direction), {"tokens": capacity, "queued": 0.0})
+        bucket["tokens"] = min(bucket["tokens"] + rate * interval, capacity)
+        queued = bucket["queued"]
+        sent = min(queued + amount, bucket["tokens"])
+        bucket["tokens"] -= sent
+        backlog = queued + amount - sent
+        # FIFO queue with tail drop: the oldest bytes go out first, the newest are dropped
+        dropped = max(backlog - rate * self.queue_seconds, 0)
+        bucket["queued"] = backlog - dropped
+        delayed = amount - max(sent - queued, 0) - dropped
+
+        result = self.results.setdefault(app, {
+            "download": 0.0, "download_delayed": 0.0, "download_dropped": 0.0,
+            "upload": 0.0, "upload_delayed": 0.0, "upload_dropped": 0.0, "max_delay": 0.0
+        })
+        result[direction] += amount
+        result[f"{direction}_delayed"] += delayed
+        result[f"{direction}_dropped"] += dropped
+        result["max_delay"] = max(result["max_delay"], bucket["queued"] / rate)
+
+    def report(self):
+        with self.lock:
+            return sorted(((app, dict(result)) for app, result in self.results.items()),
+                          key=lambda item: item[1]["download_dropped"] + item[1]["upload_dropped"],
+                          reverse=True)
+
+# Parallel history engine: aggregates date partitions in a process pool
+class HistoryEngine:
+    def __init__(self, db_path, max_workers=None, idle_shutdown_ms=60000):
+        self.db_path = db_path
+        self.max_workers = max_workers or min(os.cpu_count() or 1, 4)
+        self.executor = None
+        self.executor_workers = 0
+        self.jobs = []
+        self.poll_timer = QTimer()
+        self.poll_timer.timeout.connect(self.poll)
+        # Workers hold memory for as long as the pool lives, so release them once queries stop
+        self.idle_timer = QTimer()
+        self.idle_timer.setSingleShot(True)
+        self.idle_timer.setInterval(idle_shutdown_ms)
+        self.idle_timer.timeout.connect(self.shutdown_if_idle)
+
+    def partitions(self, date_from, date_to):
+        # Hour partitions for short ranges, day partitions otherwise; date_to is inclusive
+        start = datetime.combine(date_from, datetime.min.time())
+        end = datetime.combine(date_to, datetime.min.time()) + timedelta(days=1)
+        span = end - start
+        step = timedelta(hours=1) if span <= timedelta(days=2) else timedelta(days=1)
+        bucket_seconds = 60 if span <= timedelta(days=2) else 600 if span <= timedelta(days=7) else 3600
+        bounds = []
+        while start < end:
+            bounds.append((start, min(start + step, end)))
+            start += step
+        return bounds, bucket_seconds
+
+    def ensure_executor(self, partitions):
+        workers = min(self.max_workers, partitions)
+        if self.executor is not None and self.executor_workers < workers and not self.jobs:
+            self.reset_executor()
+        if self.executor is None:
+            # spawn keeps the workers free of the GUI process's Qt state and threads
+            self.executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+            self.executor_workers = workers
+
+    def submit(self, *args):
+        # Workers are started on submit. A spawned child re-imports the parent's __main__ module,
+        # which here is the GUI script with Qt, matplotlib and pandas, so it points at the
+        # sqlite-only worker module while they start.
+        main_module = sys.modules["__main__"]
+        sys.modules["__main__"] = history_worker
+        try:
+            return self.executor.submit(history_worker.aggregate_history_partition, *args)
+        except BrokenProcessPool:
+            self.reset_executor()
+            self.ensure_executor(self.max_workers)
+            return self.executor.submit(history_worker.aggregate_history_partition, *args)
+        finally:
+            sys.modules["__main__"] = main_module
+
+    def reset_executor(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+            self.executor_workers = 0
+
+    def shutdown_if_idle(self):
+        if not self.jobs:
+            self.reset_executor()
+
+    def query(self, date_from, date_to, app_filter, on_partial, on_done=None, on_error=None, base=None):
+        # With a finished base job for the same inputs, only partitions that may have gained rows
+        # since it started (or that failed) are queried again
+        bounds, bucket_seconds = self.partitions(date_from, date_to)
+        key = (date_from, date_to, app_filter)
+        partials = {}
+        refresh = range(len(bounds))
+        if base is not None and base["key"] == key and not base["futures"]:
+            # Stale partials stay in place until their replacements arrive, so the view doesn't shrink
+            partials = dict(base["partials"])
+            refresh = [index for index, (start, end) in enumerate(bounds)
+                       if index not in partials or end > base["started"]]
+            if not refresh:
+                return base
+        job = {
+            "key": key,
+            "started": datetime.now(),
+            "partials": partials,
+            "futures": {},
+            "total": len(bounds),
+            "on_partial": on_partial,
+            "on_done": on_done,
+            "on_error": on_error
+        }
+        self.idle_timer.stop()
+        self.ensure_executor(len(refresh))
+        for index in refresh:
+            start, end = bounds[index]
+            future = self.submit(self.db_path, start.strftime("%Y-%m-%d %H:%M:%S"),
+                                 end.strftime("%Y-%m-%d %H:%M:%S"), app_filter, bucket_seconds)
+            job["futures"][future] = index
+        self.jobs.append(job)
+        if not self.poll_timer.isActive():
+            self.poll_timer.start(100)
+        return job
+
+    def cancel(self, job):
+        for future in job["futures"]:
+            future.cancel()
+        if job in self.jobs:
+            self.jobs.remove(job)
+
+    def result(self, job):
+        merged = {"days": {}, "series": {}}
+        for index in sorted(job["partials"]):
+            merge_history_partials(merged, job["partials"][index])
+        return merged
+
+    def poll(self):
+        for job in list(self.jobs):
+            done = [future for future in job["futures"] if future.done()]
+            if done:
+                errors = []
+                for future in done:
+                    index = job["futures"].pop(future)
+                    try:
+                        job["partials"][index] = future.result()
+                    except BrokenProcessPool as e:
+                        # A worker died; the next submit gets a fresh pool
+                        self.reset_executor()
+                        errors.append(str(e) or "worker process terminated")
+                    except (sqlite3.Error, OSError, CancelledError, pickle.PicklingError) as e:
+                        errors.append(str(e) or type(e).__name__)
+                if errors and job["on_error"] is not None:
+                    job["on_error"](f"{len(errors)} history partition(s) failed: {errors[0]}")
+                job["on_partial"](self.result(job))
+            if not job["futures"] and job in self.jobs:
+                self.jobs.remove(job)
+                if job["on_done"] is not None:
+                    job["on_done"](self.result(job))
+        if not self.jobs:
+            self.poll_timer.stop()
+            self.idle_timer.start()
+
+    def shutdown(self):
+        self.poll_timer.stop()
+        self.idle_timer.stop()
+        self.reset_executor()
+
+# Refresh scheduler for UI views
+class RefreshScheduler:
+    def __init__(self, tick_ms=250, coalesce_ms=150):
+        self.views = {}
+        self.pending = set()
+        self.paused = True
+        self.last_trigger = time.monotonic()
+        self.tick_ms = tick_ms
+        self.tick_timer = QTimer()
+        self.tick_timer.timeout.connect(self.tick)
+        self.coalesce_timer = QTimer()
+        self.coalesce_timer.setSingleShot(True)
+        self.coalesce_timer.setInterval(coalesce_ms)
+        self.coalesce_timer.timeout.connect(self.flush)
+
+    def register(self, name, callback, interval_ms, is_visible=None, depends_on=()):
+        # Views are refreshed in registration order, so register dependencies first.
+        # A callback returning False reports "nothing changed" and does not invalidate dependents.
+        self.views[name] = {
+            "callback": callback,
+            "interval": interval_ms / 1000,
+            "is_visible": is_visible or (lambda: True),
+            "depends_on": tuple(depends_on),
+            "last_run": 0.0,
+            "stale": True,
+            "runs": 0,
+            "skipped": 0,
+            "triggers": 0,
+            "last_ms": 0.0,
+            "total_ms": 0.0,
+            "max_ms": 0.0
+        }
+
+    def start(self):
+        self.paused = False
+        self.tick_timer.start(self.tick_ms)
+        if self.pending:
+            self.coalesce_timer.start()
+
+    def stop(self):
+        self.paused = True
+        self.tick_timer.stop()
+        self.coalesce_timer.stop()
+
+    def request(self, *names):
+        # Triggered views are only handled by flush(), so a tick inside the window can't run them early
+        self.last_trigger = time.monotonic()
+        for name in names or self.views:
+            self.views[name]["triggers"] += 1
+            self.pending.add(name)
+        # Bursts of triggers within the coalescing window collapse into a single flush
+        if not self.paused and not self.coalesce_timer.isActive():
+            self.coalesce_timer.start()
+
+    def flush(self):
+        pending, self.pending = self.pending, set()
+        for name, view in self.views.items():
+            if name in pending or view["stale"]:
+                if view["is_visible"]():
+                    self.run(name)
+                else:
+                    view["stale"] = True
+
+    def tick(self):
+        now = time.monotonic()
+        for name, view in self.views.items():
+            if name in self.pending:
+                continue
+            due = now - view["last_run"] >= view["interval"]
+            if not view["is_visible"]():
+                if due and not view["stale"]:
+                    view["stale"] = True
+                    view["skipped"] += 1
+                continue
+            if view["stale"] or due:
+                self.run(name)
+
+    def run(self, name):
+        view = self.views[name]
+        start = time.perf_counter()
+        changed = view["callback"]()
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        view["last_run"] = time.monotonic()
+        view["stale"] = False
+        view["runs"] += 1
+        view["last_ms"] = elapsed_ms
+        view["total_ms"] += elapsed_ms
+        view["max_ms"] = max(view["max_ms"], elapsed_ms)
+        self.pending.discard(name)
+        if changed is not False:
+            for other in self.views.values():
+                if name in other["depends_on"]:
+                    other["stale"] = True
+
+    def report(self):
+        rows = []
+        for name, view in self.views.items():
+            avg_ms = view["total_ms"] / view["runs"] if view["runs"] else 0.0
+            rows.append((name, view["runs"], view["skipped"], view["triggers"],
+                         view["last_ms"], avg_ms, view["max_ms"]))
+        return rows
+
 # BandwidthBuddy Main Window
 class BandwidthBuddy(QMainWindow):
     def __init__(self, app):
@@ -117,16 +935,34 @@ class BandwidthBuddy(QMainWindow):
         self.setWindowIcon(QIcon("BandwidthBuddy.jpg"))
         self.theme_manager = ThemeManager(app)
         self.translator = Translator()
+        self.analyzer = TrafficAnalyzer()
+        self.connection_collector = ConnectionCollector()
+        self.replay_active = False
+        self.replay_dialog = None
+        self.pipeline_time = None
+        # Guards replay_active and the pipeline state against the collector and replay threads
+        self.pipeline_lock = threading.Lock()
+        self.history_engine = HistoryEngine(DB_PATH)
+        self.history_job = None
+        self.history_plot_dialog = None
+        self.previous_net_io = {}
+        self.previous_samples = {}
+        self.plot_data = {"times": deque(maxlen=PLOT_HISTORY), "downloads": {}, "uploads": {}}
         self.init_db()
         self.init_ui()
         self.init_monitoring()
-        self.previous_net_io = {}
-        self.plot_data = {"times": [], "downloads": {}, "uploads": {}}
 
     def init_db(self):
         init_db()
 
     def init_ui(self):
+        # Refresh scheduler; created first so widget signals can trigger it
+        self.scheduler = RefreshScheduler()
+        self.maintenance = DatabaseMaintenance(
+            DB_PATH,
+            is_idle=lambda: self.scheduler.paused or time.monotonic() - self.scheduler.last_trigger > IDLE_SECONDS
+        )
+
         # Central widget
         self.central_widget = QWidget()
         self.setCentralWidget(self.central_widget)
@@ -158,6 +994,7 @@ class BandwidthBuddy(QMainWindow):
         ])
         self.table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
         self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.cellDoubleClicked.connect(self.open_connections_dialog)
         self.monitor_layout.addWidget(self.table)
 
         # Plot controls
@@ -166,13 +1003,13 @@ class BandwidthBuddy(QMainWindow):
 
         self.plot_type = QComboBox()
         self.plot_type.addItems([self.tr("Bar"), self.tr("Line"), self.tr("Pie"), self.tr("Area")])
-        self.plot_type.currentIndexChanged.connect(self.update_plot)
+        self.plot_type.currentIndexChanged.connect(lambda: self.scheduler.request("plot"))
         self.plot_controls.addWidget(QLabel(self.tr("Plot Type:")))
         self.plot_controls.addWidget(self.plot_type)
 
         self.time_range = QComboBox()
         self.time_range.addItems([self.tr("Last 10s"), self.tr("Last 1m"), self.tr("Last 5m"), self.tr("Last 1h")])
-        self.time_range.currentIndexChanged.connect(self.update_plot)
+        self.time_range.currentIndexChanged.connect(lambda: self.scheduler.request("plot"))
         self.plot_controls.addWidget(QLabel(self.tr("Time Range:")))
         self.plot_controls.addWidget(self.time_range)
 
@@ -200,6 +1037,10 @@ class BandwidthBuddy(QMainWindow):
         self.limit_button.clicked.connect(self.open_limit_dialog)
         self.controls_layout.addWidget(self.limit_button)
 
+        self.connections_button = QPushButton(self.tr("Connections"))
+        self.connections_button.clicked.connect(self.open_connections_dialog)
+        self.controls_layout.addWidget(self.connections_button)
+
         self.refresh_button = QPushButton(self.tr("Refresh"))
         self.refresh_button.clicked.connect(self.update_ui)
         self.controls_layout.addWidget(self.refresh_button)
@@ -214,19 +1055,19 @@ class BandwidthBuddy(QMainWindow):
 
         self.date_from = QDateEdit()
         self.date_from.setDate(QDate.currentDate().addDays(-7))
-        self.date_from.dateChanged.connect(self.update_history_table)
+        self.date_from.dateChanged.connect(lambda: self.scheduler.request("history"))
         self.history_controls.addWidget(QLabel(self.tr("From:")))
         self.history_controls.addWidget(self.date_from)
 
         self.date_to = QDateEdit()
         self.date_to.setDate(QDate.currentDate())
-        self.date_to.dateChanged.connect(self.update_history_table)
+        self.date_to.dateChanged.connect(lambda: self.scheduler.request("history"))
         self.history_controls.addWidget(QLabel(self.tr("To:")))
         self.history_controls.addWidget(self.date_to)
 
         self.history_app_filter = QComboBox()
         self.history_app_filter.addItem(self.tr("All Apps"))
-        self.history_app_filter.currentIndexChanged.connect(self.update_history_table)
+        self.history_app_filter.currentIndexChanged.connect(lambda: self.scheduler.request("history"))
         self.history_controls.addWidget(QLabel(self.tr("Filter App:")))
         self.history_controls.addWidget(self.history_app_filter)
 
@@ -248,13 +1089,58 @@ class BandwidthBuddy(QMainWindow):
         self.history_plot_button.clicked.connect(self.show_history_plot)
         self.history_layout.addWidget(self.history_plot_button)
 
+        # Top Talkers Tab
+        self.talkers_tab = QWidget()
+        self.talkers_layout = QVBoxLayout(self.talkers_tab)
+        self.tabs.addTab(self.talkers_tab, self.tr("Top Talkers"))
+
+        self.talkers_table = QTableWidget()
+        self.talkers_table.setColumnCount(7)
+        self.talkers_table.setHorizontalHeaderLabels([
+            self.tr("Application"),
+            self.tr("Total (MB)"),
+            self.tr("Error (MB)"),
+            self.tr("Rate (KB/s)"),
+            self.tr("Baseline (KB/s)"),
+            self.tr("Z-Score"),
+            self.tr("Flags")
+        ])
+        self.talkers_table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
+        self.talkers_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.talkers_table.setSortingEnabled(True)
+        self.talkers_table.sortByColumn(1, Qt.SortOrder.DescendingOrder)
+        self.talkers_layout.addWidget(self.talkers_table)
+
+        # Status bar with database statistics
+        self.db_stats_label = QLabel()
+        self.statusBar().addPermanentWidget(self.db_stats_label)
+
         # Menu Bar
         self.init_menu_bar()
 
-        # Timer for updating UI
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_ui)
-        self.timer.start(1000)
+        # Views refreshed by the scheduler, each only while it is visible
+        self.scheduler.register("app_selector", self.update_app_selector, 5000,
+                                lambda: self.is_window_visible())
+        self.scheduler.register("table", self.update_table, 1000,
+                                lambda: self.is_window_visible() and self.table.isVisible(),
+                                depends_on=("app_selector",))
+        self.scheduler.register("plot", self.update_plot, 1000,
+                                lambda: self.is_window_visible() and self.canvas.isVisible(),
+                                depends_on=("app_selector",))
+        self.scheduler.register("history", self.update_history_table, 10000,
+                                lambda: self.is_window_visible() and self.history_table.isVisible(),
+                                depends_on=("app_selector",))
+        self.scheduler.register("talkers", self.update_talkers_table, 2000,
+                                lambda: self.is_window_visible() and self.talkers_table.isVisible())
+        self.scheduler.register("db_stats", self.update_db_stats, 30000,
+                                lambda: self.is_window_visible())
+        self.scheduler.start()
+        self.maintenance.start()
+        if self.maintenance.upgrade_pending:
+            self.statusBar().showMessage(self.tr("Upgrading database in the background..."))
+            self.upgrade_timer = QTimer()
+            self.upgrade_timer.timeout.connect(self.check_upgrade)
+            self.upgrade_timer.start(500)
 
         # Apply default theme
         self.theme_manager.apply_theme("Windows 11")
@@ -304,6 +1190,14 @@ class BandwidthBuddy(QMainWindow):
         export_action.triggered.connect(self.export_report)
         file_menu.addAction(export_action)
 
+        replay_action = QAction(self.tr("Replay / Simulate Limits"), self)
+        replay_action.triggered.connect(self.open_replay_dialog)
+        file_menu.addAction(replay_action)
+
+        self.compact_action = QAction(self.tr("Compact Database"), self)
+        self.compact_action.triggered.connect(self.compact_database)
+        file_menu.addAction(self.compact_action)
+
         exit_action = QAction(self.tr("Exit"), self)
         exit_action.triggered.connect(self.close)
         file_menu.addAction(exit_action)
@@ -322,6 +1216,17 @@ class BandwidthBuddy(QMainWindow):
         toggle_plot.triggered.connect(lambda: self.canvas.setVisible(toggle_plot.isChecked()))
         view_menu.addAction(toggle_plot)
 
+        collect_connections = QAction(self.tr("Collect Connections"), self)
+        collect_connections.setCheckable(True)
+        collect_connections.setChecked(self.connection_collector.enabled)
+        collect_connections.triggered.connect(
+            lambda: setattr(self.connection_collector, "enabled", collect_connections.isChecked()))
+        view_menu.addAction(collect_connections)
+
+        refresh_stats_action = QAction(self.tr("Refresh Statistics"), self)
+        refresh_stats_action.triggered.connect(self.show_refresh_stats)
+        view_menu.addAction(refresh_stats_action)
+
         # Toolbar actions
         export_action = QAction(QIcon("BandwidthBuddy.jpg"), self.tr("Export"), self)
         export_action.triggered.connect(self.export_report)
@@ -346,6 +1251,7 @@ class BandwidthBuddy(QMainWindow):
         self.setWindowTitle(self.tr("BandwidthBuddy"))
         self.tabs.setTabText(0, self.tr("Real-time Monitoring"))
         self.tabs.setTabText(1, self.tr("History"))
+        self.tabs.setTabText(2, self.tr("Top Talkers"))
         self.table.setHorizontalHeaderLabels([
             self.tr("Application"),
             self.tr("Download (KB/s)"),
@@ -362,6 +1268,15 @@ class BandwidthBuddy(QMainWindow):
             self.tr("Duration (s)"),
             self.tr("Avg Speed (KB/s)")
         ])
+        self.talkers_table.setHorizontalHeaderLabels([
+            self.tr("Application"),
+            self.tr("Total (MB)"),
+            self.tr("Error (MB)"),
+            self.tr("Rate (KB/s)"),
+            self.tr("Baseline (KB/s)"),
+            self.tr("Z-Score"),
+            self.tr("Flags")
+        ])
         self.view_mode.clear()
         self.view_mode.addItems([self.tr("All Apps"), self.tr("Individual Apps")])
         self.plot_type.clear()
@@ -369,11 +1284,12 @@ class BandwidthBuddy(QMainWindow):
         self.time_range.clear()
         self.time_range.addItems([self.tr("Last 10s"), self.tr("Last 1m"), self.tr("Last 5m"), self.tr("Last 1h")])
         self.limit_button.setText(self.tr("Set Bandwidth Limit"))
+        self.connections_button.setText(self.tr("Connections"))
         self.refresh_button.setText(self.tr("Refresh"))
         self.history_plot_button.setText(self.tr("Show History Plot"))
         self.history_app_filter.clear()
         self.history_app_filter.addItem(self.tr("All Apps"))
-        conn = sqlite3.connect("bandwidth_buddy.db")
+        conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
         cursor.execute("SELECT DISTINCT app_name FROM bandwidth_usage")
         apps = [row[0] for row in cursor.fetchall()]
@@ -386,7 +1302,8 @@ class BandwidthBuddy(QMainWindow):
 
     def monitor_bandwidth(self):
         while True:
-            current_net_io = {}
+            process_samples = {}
+            db_locked = False
             for proc in psutil.process_iter(['name', 'pid']):
                 try:
                     net_io = psutil.net_io_counters(pernic=True)
@@ -394,54 +1311,119 @@ class BandwidthBuddy(QMainWindow):
                         download = net_io[interface].bytes_recv
                         upload = net_io[interface].bytes_sent
                         app_name = proc.info['name']
-                        if app_name not in current_net_io:
-                            current_net_io[app_name] = {"download": 0, "upload": 0}
-                        current_net_io[app_name]["download"] += download
-                        current_net_io[app_name]["upload"] += upload
-
-                        conn = sqlite3.connect("bandwidth_buddy.db")
-                        cursor = conn.cursor()
-                        cursor.execute(
-                            "INSERT INTO bandwidth_usage (app_name, download_bytes, upload_bytes, timestamp) VALUES (?, ?, ?, ?)",
-                            (app_name, download, upload, datetime.now())
-                        )
-                        conn.commit()
-                        conn.close()
+                        _, total_download, total_upload = process_samples.get(proc.info['pid'], (app_name, 0, 0))
+                        process_samples[proc.info['pid']] = (app_name, total_download + download,
+                                                             total_upload + upload)
+
+                        if db_locked:
+                            continue
+                        conn = sqlite3.connect(DB_PATH)
+                        try:
+                            cursor = conn.cursor()
+                            cursor.execute(
+                                "INSERT INTO bandwidth_usage (app_name, download_bytes, upload_bytes, timestamp) VALUES (?, ?, ?, ?)",
+                                (app_name, download, upload, datetime.now())
+                            )
+                            conn.commit()
+                        except sqlite3.OperationalError:
+                            # Locked by a database upgrade or compaction; drop this tick's rows instead of stalling
+                            db_locked = True
+                        finally:
+                            conn.close()
                 except (psutil.NoSuchProcess, psutil.AccessDenied):
                     continue
 
-            self.update_previous_net_io(current_net_io)
+            # While a replay drives the pipeline, live samples are only recorded
+            with self.pipeline_lock:
+                deltas = None if self.replay_active else self.update_previous_net_io(process_samples)
+            if deltas is not None:
+                self.connection_collector.observe(deltas)
             time.sleep(1)
 
-    def update_previous_net_io(self, current_net_io):
+    def reset_pipeline(self):
+        self.analyzer = TrafficAnalyzer()
+        self.previous_net_io = {}
+        self.previous_samples = {}
+        self.plot_data = {"times": deque(maxlen=PLOT_HISTORY), "downloads": {}, "uploads": {}}
+        self.pipeline_time = None
+
+    def pipeline_now(self):
+        # The plot's clock: the last replayed timestamp during a replay, wall time otherwise
+        if self.replay_active and self.pipeline_time is not None:
+            return self.pipeline_time
+        return datetime.now()
+
+    def plot_data_window(self, app, start_time):
+        # list() copies a deque atomically; iterating it directly would race the collector's appends
+        return [(t, d, u) for t, d, u in zip(list(self.plot_data["times"]),
+                                             list(self.plot_data["downloads"].get(app, [])),
+                                             list(self.plot_data["uploads"].get(app, [])))
+                if t >= start_time]
+
+    def start_replay(self):
+        with self.pipeline_lock:
+            self.replay_active = True
+            self.reset_pipeline()
+
+    def end_replay(self):
+        with self.pipeline_lock:
+            self.reset_pipeline()
+            self.replay_active = False
+
+    def update_previous_net_io(self, process_samples, timestamp=None):
+        timestamp = timestamp or datetime.now()
+        current_net_io = {}
+        for app, download, upload in process_samples.values():
+            data = current_net_io.setdefault(app, {"download": 0, "upload": 0})
+            data["download"] += download
+            data["upload"] += upload
+        deltas = self.analyzer.observe(self.previous_samples, process_samples, timestamp)
+        self.previous_samples = process_samples
         self.previous_net_io = current_net_io
-        timestamp = datetime.now()
+        self.pipeline_time = timestamp
         self.plot_data["times"].append(timestamp)
         for app, data in current_net_io.items():
+            # Bounded deques drop the oldest sample on append instead of re-slicing every series per tick
             if app not in self.plot_data["downloads"]:
-                self.plot_data["downloads"][app] = []
-                self.plot_data["uploads"][app] = []
+                self.plot_data["downloads"][app] = deque(maxlen=PLOT_HISTORY)
+                self.plot_data["uploads"][app] = deque(maxlen=PLOT_HISTORY)
             self.plot_data["downloads"][app].append(data["download"] / 1024 / 1024)
             self.plot_data["uploads"][app].append(data["upload"] / 1024 / 1024)
-        if len(self.plot_data["times"]) > 3600:
-            self.plot_data["times"] = self.plot_data["times"][-3600:]
-            for app in self.plot_data["downloads"]:
-                self.plot_data["downloads"][app] = self.plot_data["downloads"][app][-3600:]
-                self.plot_data["uploads"][app] = self.plot_data["uploads"][app][-3600:]
+        return deltas
+
+    def is_window_visible(self):
+        return self.isVisible() and not self.isMinimized()
+
+    def changeEvent(self, event):
+        # Stop all UI refreshes while minimized; catch up on restore
+        if event.type() == QEvent.Type.WindowStateChange:
+            if self.isMinimized():
+                self.scheduler.stop()
+            elif self.scheduler.paused:
+                self.scheduler.start()
+        super().changeEvent(event)
+
+    def closeEvent(self, event):
+        self.scheduler.stop()
+        self.maintenance.stop()
+        self.history_engine.shutdown()
+        super().closeEvent(event)
 
     def update_ui(self):
-        self.update_table()
-        self.update_plot()
-        self.update_app_selector()
-        self.update_history_table()
+        self.scheduler.request()
 
     def update_view(self):
-        self.update_table()
-        self.update_plot()
+        self.scheduler.request("table", "plot")
+
+    def show_refresh_stats(self):
+        lines = [self.tr("View: runs / skipped / triggers, last / avg / max ms")]
+        for name, runs, skipped, triggers, last_ms, avg_ms, max_ms in self.scheduler.report():
+            lines.append(f"{name}: {runs} / {skipped} / {triggers}, {last_ms:.1f} / {avg_ms:.1f} / {max_ms:.1f}")
+        QMessageBox.information(self, self.tr("Refresh Statistics"), "\n".join(lines))
 
     def update_table(self):
         self.table.setRowCount(0)
-        conn = sqlite3.connect("bandwidth_buddy.db")
+        conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
         
         if self.view_mode.currentText() == self.tr("All Apps"):
@@ -491,28 +1473,65 @@ class BandwidthBuddy(QMainWindow):
                         status = f"{self.tr('Limited')} ({result[3] or '∞'} kbps ↓, {result[4] or '∞'} kbps ↑)"
                     self.table.setItem(0, 5, QTableWidgetItem(status))
         
+        self.highlight_anomalies(self.table)
         self.table.resizeColumnsToContents()
         conn.close()
 
+    def highlight_anomalies(self, table):
+        anomalous = self.analyzer.anomalous_apps()
+        for row in range(table.rowCount()):
+            item = table.item(row, 0)
+            if item is None or item.text() not in anomalous:
+                continue
+            for column in range(table.columnCount()):
+                cell = table.item(row, column)
+                if cell is not None:
+                    cell.setBackground(QColor(255, 200, 200))
+
+    def update_talkers_table(self):
+        rows = self.analyzer.snapshot()
+        self.talkers_table.setSortingEnabled(False)
+        self.talkers_table.setRowCount(len(rows))
+        for row, (app_name, total, error, rate, mean, z, flags) in enumerate(rows):
+            self.talkers_table.setItem(row, 0, QTableWidgetItem(app_name))
+            values = [total / 1024 / 1024, error / 1024 / 1024, rate / 1024, mean / 1024, z]
+            for column, value in enumerate(values, start=1):
+                # Numeric display data keeps column sorting numeric
+                item = QTableWidgetItem()
+                item.setData(Qt.ItemDataRole.DisplayRole, round(value, 2))
+                self.talkers_table.setItem(row, column, item)
+            self.talkers_table.setItem(row, 6, QTableWidgetItem(", ".join(self.tr(flag) for flag in flags)))
+        self.talkers_table.setSortingEnabled(True)
+        self.highlight_anomalies(self.talkers_table)
+        self.talkers_table.resizeColumnsToContents()
+
     def update_plot(self):
         self.ax.clear()
         time_range = self.time_range.currentText()
         seconds = {"Last 10s": 10, "Last 1m": 60, "Last 5m": 300, "Last 1h": 3600}
         limit = seconds.get(time_range, 10)
-        start_time = datetime.now() - pd.Timedelta(seconds=limit)
+        start_time = self.pipeline_now() - pd.Timedelta(seconds=limit)
 
         if self.view_mode.currentText() == self.tr("All Apps"):
-            conn = sqlite3.connect("bandwidth_buddy.db")
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT app_name, SUM(download_bytes) / 1024 / 1024 as total_download,
-                       SUM(upload_bytes) / 1024 / 1024 as total_upload
-                FROM bandwidth_usage
-                WHERE timestamp >= ?
-                GROUP BY app_name
-            """, (start_time,))
-            results = cursor.fetchall()
-            conn.close()
+            if self.replay_active:
+                # Replayed ticks only exist in plot_data, so sum them there instead of in the database
+                results = []
+                for app in list(self.plot_data["downloads"]):
+                    app_data = self.plot_data_window(app, start_time)
+                    if app_data:
+                        results.append((app, sum(d for _, d, _ in app_data), sum(u for _, _, u in app_data)))
+            else:
+                conn = sqlite3.connect(DB_PATH)
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT app_name, SUM(download_bytes) / 1024 / 1024 as total_download,
+                           SUM(upload_bytes) / 1024 / 1024 as total_upload
+                    FROM bandwidth_usage
+                    WHERE timestamp >= ?
+                    GROUP BY app_name
+                """, (start_time,))
+                results = cursor.fetchall()
+                conn.close()
 
             apps = [r[0] for r in results]
             downloads = [r[1] for r in results]
@@ -530,10 +1549,7 @@ class BandwidthBuddy(QMainWindow):
                     self.ax.legend()
             elif self.plot_type.currentText() == self.tr("Line"):
                 for app in apps:
-                    app_data = [(t, d, u) for t, d, u in zip(self.plot_data["times"], 
-                                                              self.plot_data["downloads"].get(app, []),
-                                                              self.plot_data["uploads"].get(app, []))
-                                if t >= start_time]
+                    app_data = self.plot_data_window(app, start_time)
                     if app_data:
                         times, dls, uls = zip(*app_data)
                         self.ax.plot(times, dls, label=f"{app} {self.tr('Download')}", marker='o')
@@ -548,10 +1564,7 @@ class BandwidthBuddy(QMainWindow):
                     self.ax.set_title(self.tr("Download Distribution"))
             elif self.plot_type.currentText() == self.tr("Area"):
                 for app in apps:
-                    app_data = [(t, d, u) for t, d, u in zip(self.plot_data["times"], 
-                                                              self.plot_data["downloads"].get(app, []),
-                                                              self.plot_data["uploads"].get(app, []))
-                                if t >= start_time]
+                    app_data = self.plot_data_window(app, start_time)
                     if app_data:
                         times, dls, uls = zip(*app_data)
                         self.ax.fill_between(times, dls, label=f"{app} {self.tr('Download')}", alpha=0.5)
@@ -563,17 +1576,20 @@ class BandwidthBuddy(QMainWindow):
         else:
             selected_app = self.app_selector.currentText()
             if selected_app and selected_app != self.tr("Select App"):
-                conn = sqlite3.connect("bandwidth_buddy.db")
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT timestamp, download_bytes / 1024 / 1024 as download,
-                           upload_bytes / 1024 / 1024 as upload
-                    FROM bandwidth_usage
-                    WHERE app_name = ? AND timestamp >= ?
-                    ORDER BY timestamp
-                """, (selected_app, start_time))
-                results = cursor.fetchall()
-                conn.close()
+                if self.replay_active:
+                    results = self.plot_data_window(selected_app, start_time)
+                else:
+                    conn = sqlite3.connect(DB_PATH)
+                    cursor = conn.cursor()
+                    cursor.execute("""
+                        SELECT timestamp, download_bytes / 1024 / 1024 as download,
+                               upload_bytes / 1024 / 1024 as upload
+                        FROM bandwidth_usage
+                        WHERE app_name = ? AND timestamp >= ?
+                        ORDER BY timestamp
+                    """, (selected_app, start_time))
+                    results = cursor.fetchall()
+                    conn.close()
 
                 times = [pd.to_datetime(r[0]) for r in results]
                 downloads = [r[1] for r in results]
@@ -615,103 +1631,138 @@ class BandwidthBuddy(QMainWindow):
         self.canvas.draw()
 
     def update_app_selector(self):
-        current_selection = self.app_selector.currentText()
-        self.app_selector.clear()
-        self.app_selector.addItem(self.tr("Select App"))
-        conn = sqlite3.connect("bandwidth_buddy.db")
+        conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
         cursor.execute("SELECT DISTINCT app_name FROM bandwidth_usage")
         apps = [row[0] for row in cursor.fetchall()]
+        conn.close()
+        # Rebuilding the combos fires their change signals, so only do it when the app list changed
+        if apps == [self.app_selector.itemText(i) for i in range(1, self.app_selector.count())]:
+            return False
+        current_selection = self.app_selector.currentText()
+        current_filter = self.history_app_filter.currentText()
+        self.app_selector.clear()
+        self.app_selector.addItem(self.tr("Select App"))
         self.app_selector.addItems(apps)
         self.history_app_filter.clear()
         self.history_app_filter.addItem(self.tr("All Apps"))
         self.history_app_filter.addItems(apps)
         if current_selection in apps:
             self.app_selector.setCurrentText(current_selection)
-        conn.close()
+        if current_filter in apps:
+            self.history_app_filter.setCurrentText(current_filter)
+        return True
+
+    def update_db_stats(self):
+        stats = self.maintenance.stats()
+        self.db_stats_label.setText(
+            f"{self.tr('Database')}: {stats['db_size'] / 1024 / 1024:.1f} MB, "
+            f"WAL {stats['wal_size'] / 1024 / 1024:.1f} MB, "
+            f"{self.tr('Fragmentation')} {stats['fragmentation']:.1f}%"
+        )
 
-    def update_history_table(self):
-        self.history_table.setRowCount(0)
-        conn = sqlite3.connect("bandwidth_buddy.db")
-        cursor = conn.cursor()
-        
-        date_from = self.date_from.date().toString("yyyy-MM-dd")
-        date_to = self.date_to.date().toString("yyyy-MM-dd")
+    def compact_database(self):
+        # The full pass runs on the maintenance thread; poll for it like the replay dialog does
+        self.compact_action.setEnabled(False)
+        self.statusBar().showMessage(self.tr("Compacting database..."))
+        self.maintenance.request_full()
+        self.compact_timer = QTimer()
+        self.compact_timer.timeout.connect(self.check_compaction)
+        self.compact_timer.start(500)
+
+    def check_compaction(self):
+        if not self.maintenance.full_done.is_set():
+            return
+        self.compact_timer.stop()
+        self.compact_action.setEnabled(True)
+        self.scheduler.request("db_stats")
+        if self.maintenance.last_error is not None:
+            self.statusBar().showMessage(
+                self.tr(f"Database compaction failed: {self.maintenance.last_error}"), 10000)
+        else:
+            self.statusBar().showMessage(
+                self.tr(f"Database compacted, {self.maintenance.last_pruned} expired rows removed"), 10000)
+
+    def check_upgrade(self):
+        if not self.maintenance.upgrade_done.is_set():
+            return
+        self.upgrade_timer.stop()
+        self.scheduler.request("db_stats")
+        if self.maintenance.last_error is not None:
+            self.statusBar().showMessage(
+                self.tr(f"Database upgrade failed: {self.maintenance.last_error}"), 10000)
+        else:
+            self.statusBar().showMessage(self.tr("Database upgrade finished"), 10000)
+
+    def history_app_filter_value(self):
         app_filter = self.history_app_filter.currentText()
+        return None if app_filter == self.tr("All Apps") else app_filter
 
-        query = """
-            SELECT app_name, timestamp, 
-                   SUM(download_bytes) / 1024 / 1024 as total_download,
-                   SUM(upload_bytes) / 1024 / 1024 as total_upload,
-                   (MAX(timestamp) - MIN(timestamp)) as duration
-            FROM bandwidth_usage
-            WHERE timestamp BETWEEN ? AND ?
-        """
-        params = [date_from, date_to]
-        if app_filter != self.tr("All Apps"):
-            query += " AND app_name = ?"
-            params.append(app_filter)
-        query += " GROUP BY app_name, strftime('%Y-%m-%d', timestamp)"
-
-        cursor.execute(query, params)
-        results = cursor.fetchall()
-        self.history_table.setRowCount(len(results))
-        for row, (app_name, timestamp, total_download, total_upload, duration) in enumerate(results):
+    def update_history_table(self):
+        # Aggregated in the history engine's process pool; rows fill in as partitions complete
+        key = (self.date_from.date().toPyDate(), self.date_to.date().toPyDate(), self.history_app_filter_value())
+        base = None
+        if self.history_job is not None:
+            if self.history_job["key"] != key:
+                self.history_engine.cancel(self.history_job)
+            elif self.history_job["futures"]:
+                return
+            else:
+                base = self.history_job
+        self.history_job = self.history_engine.query(*key, self.fill_history_table,
+                                                     on_error=self.show_history_error, base=base)
+
+    def show_history_error(self, message):
+        self.statusBar().showMessage(message, 10000)
+
+    def fill_history_table(self, result):
+        rows = sorted(result["days"].items())
+        self.history_table.setRowCount(len(rows))
+        for row, ((app_name, day), (download, upload, first, last)) in enumerate(rows):
+            total_download = download / 1024 / 1024
+            total_upload = upload / 1024 / 1024
+            duration = (datetime.fromisoformat(last) - datetime.fromisoformat(first)).total_seconds()
             self.history_table.setItem(row, 0, QTableWidgetItem(app_name))
-            self.history_table.setItem(row, 1, QTableWidgetItem(timestamp))
+            self.history_table.setItem(row, 1, QTableWidgetItem(day))
             self.history_table.setItem(row, 2, QTableWidgetItem(f"{total_download:.2f}"))
             self.history_table.setItem(row, 3, QTableWidgetItem(f"{total_upload:.2f}"))
-            self.history_table.setItem(row, 4, QTableWidgetItem(f"{duration if duration else 0:.2f}"))
+            self.history_table.setItem(row, 4, QTableWidgetItem(f"{duration:.2f}"))
             avg_speed = (total_download + total_upload) / (duration or 1) * 1024
             self.history_table.setItem(row, 5, QTableWidgetItem(f"{avg_speed:.2f}"))
-        
         self.history_table.resizeColumnsToContents()
-        conn.close()
 
     def open_limit_dialog(self):
         dialog = LimitDialog(self)
         dialog.exec()
 
-    def show_history_plot(self):
-        date_from = self.date_from.date().toString("yyyy-MM-dd")
-        date_to = self.date_to.date().toString("yyyy-MM-dd")
-        app_filter = self.history_app_filter.currentText()
+    def open_replay_dialog(self):
+        if self.replay_dialog is None:
+            self.replay_dialog = ReplayDialog(self)
+        self.replay_dialog.show()
+        self.replay_dialog.raise_()
 
-        conn = sqlite3.connect("bandwidth_buddy.db")
-        cursor = conn.cursor()
-        query = """
-            SELECT app_name, timestamp, download_bytes / 1024 / 1024 as download,
-                   upload_bytes / 1024 / 1024 as upload
-            FROM bandwidth_usage
-            WHERE timestamp BETWEEN ? AND ?
-        """
-        params = [date_from, date_to]
-        if app_filter != self.tr("All Apps"):
-            query += " AND app_name = ?"
-            params.append(app_filter)
-        
-        cursor.execute(query, params)
-        results = cursor.fetchall()
-        conn.close()
+    def open_connections_dialog(self, *args):
+        selected = self.table.selectedItems()
+        if selected:
+            app_name = self.table.item(selected[0].row(), 0).text()
+        else:
+            app_name = self.app_selector.currentText()
+        if not app_name or app_name == self.tr("Select App"):
+            QMessageBox.information(self, self.tr("Connections"), self.tr("Select an application first"))
+            return
+        dialog = ConnectionsDialog(self, app_name)
+        dialog.exec()
 
-        df = pd.DataFrame(results, columns=["app_name", "timestamp", "download", "upload"])
-        plt.figure(figsize=(12, 6))
-        for app in df["app_name"].unique():
-            app_data = df[df["app_name"] == app]
-            plt.plot(pd.to_datetime(app_data["timestamp"]), app_data["download"], 
-                    label=f"{app} {self.tr('Download')}", marker='o')
-            plt.plot(pd.to_datetime(app_data["timestamp"]), app_data["upload"], 
-                    label=f"{app} {self.tr('Upload')}", marker='s')
-        plt.xlabel(self.tr("Time"))
-        plt.ylabel(self.tr("Data (MB)"))
-        plt.legend()
-        plt.grid(True, linestyle='--', alpha=0.7)
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        plt.show()
+    def show_history_plot(self):
+        if self.history_plot_dialog is not None:
+            self.history_plot_dialog.close()
+        self.history_plot_dialog = HistoryPlotDialog(self)
+        self.history_plot_dialog.show()
+        self.history_plot_dialog.start(self.date_from.date().toPyDate(), self.date_to.date().toPyDate(),
+                                       self.history_app_filter_value())
 
     def export_report(self):
-        conn = sqlite3.connect("bandwidth_buddy.db")
+        conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
         cursor.execute("""
             SELECT app_name, timestamp, download_bytes / 1024 / 1024 as download,
@@ -735,7 +1786,7 @@ class LimitDialog(QDialog):
         self.layout = QFormLayout(self)
 
         self.app_selector = QComboBox()
-        conn = sqlite3.connect("bandwidth_buddy.db")
+        conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
         cursor.execute("SELECT DISTINCT app_name FROM bandwidth_usage")
         apps = [row[0] for row in cursor.fetchall()]
@@ -765,7 +1816,7 @@ class LimitDialog(QDialog):
         max_download = self.download_limit.value() if self.enable_limit.isChecked() else None
         max_upload = self.upload_limit.value() if self.enable_limit.isChecked() else None
 
-        conn = sqlite3.connect("bandwidth_buddy.db")
+        conn = sqlite3.connect(DB_PATH)
         cursor = conn.cursor()
         if max_download is None and max_upload is None:
             cursor.execute("DELETE FROM app_limits WHERE app_name = ?", (app_name,))
@@ -780,6 +1831,270 @@ class LimitDialog(QDialog):
         print(f"Applying limit to {app_name}: {max_download or '∞'} kbps download, {max_upload or '∞'} kbps upload")
         self.accept()
 
+# Connections Dialog
+class ConnectionsDialog(QDialog):
+    def __init__(self, parent, app_name):
+        super().__init__(parent)
+        self.collector = parent.connection_collector
+        self.app_name = app_name
+        self.setWindowTitle(f"{parent.tr('Connections')} - {app_name}")
+        self.setWindowIcon(QIcon("BandwidthBuddy.jpg"))
+        self.resize(700, 400)
+        self.layout = QVBoxLayout(self)
+
+        if not self.collector.enabled:
+            self.layout.addWidget(QLabel(parent.tr("Enable View > Collect Connections to gather connection data")))
+        # Sockets carry no byte counters; the collector splits each app's traffic across its connections
+        self.layout.addWidget(QLabel(parent.tr(
+            "Traffic per connection is estimated by splitting the app's traffic evenly across its open connections")))
+
+        self.table = QTableWidget()
+        self.table.setColumnCount(5)
+        self.table.setHorizontalHeaderLabels([
+            parent.tr("Remote Address"),
+            parent.tr("Port"),
+            parent.tr("Est. Download (MB)"),
+            parent.tr("Est. Upload (MB)"),
+            parent.tr("Connections")
+        ])
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.table.setSortingEnabled(True)
+        self.layout.addWidget(self.table)
+
+        self.scan_label = QLabel()
+        self.layout.addWidget(self.scan_label)
+
+        self.refresh_button = QPushButton(parent.tr("Refresh"))
+        self.refresh_button.clicked.connect(self.refresh)
+        self.layout.addWidget(self.refresh_button)
+        self.refresh()
+
+    def refresh(self):
+        rows = self.collector.snapshot(self.app_name)
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(rows))
+        for row, (address, port, download, upload, connections) in enumerate(rows):
+            self.table.setItem(row, 0, QTableWidgetItem(address))
+            for column, value in enumerate([port, round(download / 1024 / 1024, 2),
+                                            round(upload / 1024 / 1024, 2), connections], start=1):
+                item = QTableWidgetItem()
+                item.setData(Qt.ItemDataRole.DisplayRole, value)
+                self.table.setItem(row, column, item)
+        self.table.setSortingEnabled(True)
+        self.table.resizeColumnsToContents()
+        self.scan_label.setText(
+            f"{self.tr('Last connection scan')}: {self.collector.last_scan_cost * 1000:.0f} ms, "
+            f"{self.tr('skipping')} {self.collector.skip_ticks} {self.tr('ticks')}"
+        )
+
+# History Plot Dialog
+class HistoryPlotDialog(QDialog):
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.main_window = parent
+        self.job = None
+        self.setWindowTitle(parent.tr("History Plot"))
+        self.setWindowIcon(QIcon("BandwidthBuddy.jpg"))
+        self.resize(1200, 600)
+        self.layout = QVBoxLayout(self)
+
+        self.status_label = QLabel(parent.tr("Loading..."))
+        self.layout.addWidget(self.status_label)
+
+        self.figure = Figure(figsize=(12, 6))
+        self.ax = self.figure.add_subplot(111)
+        self.canvas = FigureCanvas(self.figure)
+        self.layout.addWidget(self.canvas)
+
+    def start(self, date_from, date_to, app_filter):
+        engine = self.main_window.history_engine
+        self.partitions = len(engine.partitions(date_from, date_to)[0])
+        self.error = None
+        self.job = engine.query(date_from, date_to, app_filter, self.plot, on_done=self.finish,
+                                on_error=self.show_error)
+
+    def plot(self, result):
+        tr = self.main_window.tr
+        series = {}
+        for (app_name, bucket), (download, upload) in sorted(result["series"].items()):
+            times, downloads, uploads = series.setdefault(app_name, ([], [], []))
+            # strftime('%s') treats stored local timestamps as UTC, so convert back the same way
+            times.append(datetime.fromtimestamp(bucket, timezone.utc).replace(tzinfo=None))
+            downloads.append(download / 1024 / 1024)
+            uploads.append(upload / 1024 / 1024)
+
+        self.ax.clear()
+        for app_name, (times, downloads, uploads) in series.items():
+            self.ax.plot(times, downloads, label=f"{app_name} {tr('Download')}")
+            self.ax.plot(times, uploads, label=f"{app_name} {tr('Upload')}")
+        self.ax.set_xlabel(tr("Time"))
+        self.ax.set_ylabel(tr("Data (MB)"))
+        if series:
+            self.ax.legend()
+        self.ax.grid(True, linestyle='--', alpha=0.7)
+        self.ax.tick_params(axis="x", rotation=45)
+        self.figure.tight_layout()
+        self.canvas.draw()
+        loaded = len(self.job["partials"]) if self.job else self.partitions
+        self.status_label.setText(self.status_text(loaded))
+
+    def status_text(self, loaded):
+        text = self.main_window.tr(f"{loaded} of {self.partitions} partitions loaded")
+        return f"{text} - {self.error}" if self.error else text
+
+    def show_error(self, message):
+        self.error = message
+        self.status_label.setText(self.status_text(len(self.job["partials"]) if self.job else 0))
+
+    def finish(self, result):
+        self.status_label.setText(self.status_text(len(self.job["partials"])))
+        self.job = None
+
+    def closeEvent(self, event):
+        if self.job is not None:
+            self.main_window.history_engine.cancel(self.job)
+            self.job = None
+        super().closeEvent(event)
+
+# Replay Dialog
+class ReplayDialog(QDialog):
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.main_window = parent
+        self.engine = None
+        self.shaper = None
+        self.csv_path = None
+        self.setWindowTitle(parent.tr("Replay / Simulate Limits"))
+        self.setWindowIcon(QIcon("BandwidthBuddy.jpg"))
+        self.resize(900, 500)
+        self.layout = QVBoxLayout(self)
+        self.form = QFormLayout()
+        self.layout.addLayout(self.form)
+
+        self.date_from = QDateEdit()
+        self.date_from.setDate(parent.date_from.date())
+        self.form.addRow(parent.tr("From:"), self.date_from)
+
+        self.date_to = QDateEdit()
+        self.date_to.setDate(parent.date_to.date())
+        self.form.addRow(parent.tr("To:"), self.date_to)
+
+        self.csv_button = QPushButton(parent.tr("Load Exported CSV..."))
+        self.csv_button.clicked.connect(self.choose_csv)
+        self.form.addRow(parent.tr("Source:"), self.csv_button)
+
+        self.speed = QSpinBox()
+        self.speed.setRange(0, 10000)
+        self.speed.setValue(60)
+        self.speed.setSpecialValueText(parent.tr("Max"))
+        self.form.addRow(parent.tr("Speed (x real time):"), self.speed)
+
+        # What-if limit on top of the limits stored in app_limits
+        self.what_if_app = QComboBox()
+        self.what_if_app.addItem(parent.tr("None"))
+        self.what_if_app.addItems([parent.app_selector.itemText(i) for i in range(1, parent.app_selector.count())])
+        self.form.addRow(parent.tr("What-if Application:"), self.what_if_app)
+
+        self.what_if_download = QSpinBox()
+        self.what_if_download.setRange(0, 100000)
+        self.what_if_download.setValue(1000)
+        self.form.addRow(parent.tr("Download Limit (kbps):"), self.what_if_download)
+
+        self.what_if_upload = QSpinBox()
+        self.what_if_upload.setRange(0, 100000)
+        self.what_if_upload.setValue(1000)
+        self.form.addRow(parent.tr("Upload Limit (kbps):"), self.what_if_upload)
+
+        self.start_button = QPushButton(parent.tr("Start Replay"))
+        self.start_button.clicked.connect(self.toggle_replay)
+        self.layout.addWidget(self.start_button)
+
+        self.status_label = QLabel()
+        self.layout.addWidget(self.status_label)
+
+        self.results_table = QTableWidget()
+        self.results_table.setColumnCount(8)
+        self.results_table.setHorizontalHeaderLabels([
+            parent.tr("Application"),
+            parent.tr("Download (MB)"),
+            parent.tr("Delayed ↓ (MB)"),
+            parent.tr("Dropped ↓ (MB)"),
+            parent.tr("Upload (MB)"),
+            parent.tr("Delayed ↑ (MB)"),
+            parent.tr("Dropped ↑ (MB)"),
+            parent.tr("Max Delay (s)")
+        ])
+        self.results_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.layout.addWidget(self.results_table)
+
+        self.poll_timer = QTimer()
+        self.poll_timer.timeout.connect(self.poll)
+
+    def choose_csv(self):
+        path, _ = QFileDialog.getOpenFileName(self, self.main_window.tr("Load Exported CSV..."), "", "CSV (*.csv)")
+        self.csv_path = path or None
+        self.csv_button.setText(os.path.basename(path) if path else self.main_window.tr("Load Exported CSV..."))
+
+    def load_limits(self):
+        conn = sqlite3.connect(DB_PATH)
+        cursor = conn.cursor()
+        cursor.execute("SELECT app_name, max_download_kbps, max_upload_kbps FROM app_limits")
+        limits = {app_name: (dl_limit, ul_limit) for app_name, dl_limit, ul_limit in cursor.fetchall()}
+        conn.close()
+        if self.what_if_app.currentIndex() > 0:
+            limits[self.what_if_app.currentText()] = (self.what_if_download.value(), self.what_if_upload.value())
+        return limits
+
+    def toggle_replay(self):
+        if self.engine is not None:
+            self.engine.stop()
+            return
+        if self.csv_path:
+            ticks = iter_csv_ticks(self.csv_path)
+        else:
+            date_from = self.date_from.date().toString("yyyy-MM-dd")
+            date_to = self.date_to.date().addDays(1).toString("yyyy-MM-dd")
+            ticks = iter_db_ticks(DB_PATH, date_from, date_to)
+        self.shaper = ShaperSimulation(self.load_limits())
+        self.main_window.start_replay()
+        self.engine = ReplayEngine(ticks, self.replay_sample, speed=self.speed.value())
+        self.engine.start()
+        self.start_button.setText(self.main_window.tr("Stop Replay"))
+        self.poll_timer.start(250)
+
+    def replay_sample(self, sample, timestamp):
+        # Same path as live sampling, then through the simulated shaper
+        with self.main_window.pipeline_lock:
+            deltas = self.main_window.update_previous_net_io(sample, timestamp)
+        self.shaper.observe(deltas, timestamp)
+
+    def poll(self):
+        self.status_label.setText(self.main_window.tr(f"{self.engine.ticks_played} ticks replayed"))
+        self.update_results()
+        if self.engine.finished.is_set():
+            self.poll_timer.stop()
+            if self.engine.error is not None:
+                QMessageBox.warning(self, self.main_window.tr("Replay"), str(self.engine.error))
+            self.engine = None
+            self.main_window.end_replay()
+            self.start_button.setText(self.main_window.tr("Start Replay"))
+
+    def update_results(self):
+        rows = self.shaper.report()
+        self.results_table.setRowCount(len(rows))
+        for row, (app_name, result) in enumerate(rows):
+            self.results_table.setItem(row, 0, QTableWidgetItem(app_name))
+            keys = ["download", "download_delayed", "download_dropped", "upload", "upload_delayed", "upload_dropped"]
+            for column, key in enumerate(keys, start=1):
+                self.results_table.setItem(row, column, QTableWidgetItem(f"{result[key] / 1024 / 1024:.2f}"))
+            self.results_table.setItem(row, 7, QTableWidgetItem(f"{result['max_delay']:.2f}"))
+        self.results_table.resizeColumnsToContents()
+
+    def closeEvent(self, event):
+        if self.engine is not None:
+            self.engine.stop()
+        super().closeEvent(event)
+
 # Main application
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -0,0 +1,56 @@
+"""History aggregation for BandwidthBuddy's process pool.
+
+Kept apart from the GUI script so pool workers only import sqlite3.
+"""
+import sqlite3
+from urllib.request import pathname2url
+
+# Runs in a pool process with its own read-only connection
+def aggregate_history_partition(db_path, start, end, app_filter, bucket_seconds):
+    conn = sqlite3.connect(f"file:{pathname2url(db_path)}?mode=ro", uri=True)
+    try:
+        cursor = conn.cursor()
+        where = "WHERE timestamp >= ? AND timestamp < ?"
+        params = [start, end]
+        if app_filter is not None:
+            where += " AND app_name = ?"
+            params.append(app_filter)
+
+        cursor.execute(f"""
+            SELECT app_name, strftime('%Y-%m-%d', timestamp) as day,
+                   SUM(download_bytes), SUM(upload_bytes), MIN(timestamp), MAX(timestamp)
+            FROM bandwidth_usage
+            {where}
+            GROUP BY app_name, day
+        """, params)
+        days = {(app_name, day): [download, upload, first, last]
+                for app_name, day, download, upload, first, last in cursor.fetchall()}
+
+        cursor.execute(f"""
+            SELECT app_name, CAST(strftime('%s', timestamp) AS INTEGER) / ? * ? as bucket,
+                   SUM(download_bytes), SUM(upload_bytes)
+            FROM bandwidth_usage
+            {where}
+            GROUP BY app_name, bucket
+        """, [bucket_seconds, bucket_seconds] + params)
+        series = {(app_name, bucket): [download, upload]
+                  for app_name, bucket, download, upload in cursor.fetchall()}
+    finally:
+        conn.close()
+    return {"days": days, "series": series}
+
+def merge_history_partials(merged, partial):
+    for key, (download, upload, first, last) in partial["days"].items():
+        if key in merged["days"]:
+            entry = merged["days"][key]
+            entry[0] += download
+            entry[1] += upload
+            entry[2] = min(entry[2], first)
+            entry[3] = max(entry[3], last)
+        else:
+            merged["days"][key] = [download, upload, first, last]
+    for key, (download, upload) in partial["series"].items():
+        entry = merged["series"].setdefault(key, [0, 0])
+        entry[0] += download
+        entry[1] += upload
+    return merged
@@ -0,0 +1,87 @@
+import csv
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+for module in ("PyQt6", "psutil", "matplotlib", "pandas", "qdarkstyle"):
+    pytest.importorskip(module)
+
+os.environ.setdefault("BANDWIDTHBUDDY_DATA_DIR", tempfile.mkdtemp())
+
+from BandwidthBuddy import ShaperSimulation, group_ticks, iter_csv_ticks
+
+START = datetime(2026, 1, 1, 12)
+
+
+def shape(limits, ticks, **kwargs):
+    shaper = ShaperSimulation(limits, **kwargs)
+    for tick, deltas in enumerate(ticks):
+        shaper.observe(deltas, START + timedelta(seconds=tick))
+    return dict(shaper.report())
+
+
+def test_shaper_passes_traffic_under_the_limit():
+    # 8 kbps is 1000 bytes/s
+    report = shape({"app": (8, None)}, [{"app": (500, 10 ** 6)}] * 10)
+    assert report["app"]["download"] == 5000
+    assert report["app"]["download_delayed"] == 0
+    assert report["app"]["download_dropped"] == 0
+    assert report["app"]["max_delay"] == 0
+    # An unlimited direction is not shaped
+    assert report["app"]["upload"] == 0
+
+
+def test_shaper_delays_a_burst_that_fits_the_queue():
+    report = shape({"app": (8, 8)}, [{"app": (3000, 0)}, {"app": (0, 0)}, {"app": (0, 0)}])
+    assert report["app"]["download"] == 3000
+    assert report["app"]["download_delayed"] == 2000
+    assert report["app"]["download_dropped"] == 0
+    assert report["app"]["max_delay"] == pytest.approx(2.0)
+
+
+def test_shaper_tail_drops_beyond_the_queue():
+    report = shape({"app": (8, 8)}, [{"app": (10000, 0)}], queue_seconds=5.0)
+    assert report["app"]["download_delayed"] == 5000
+    assert report["app"]["download_dropped"] == 4000
+    assert report["app"]["max_delay"] == pytest.approx(5.0)
+
+
+def test_shaper_ignores_apps_without_limits():
+    assert shape({"limited": (8, 8)}, [{"other": (10 ** 6, 10 ** 6)}]) == {}
+
+
+def burst(start, rows):
+    return [(app, download, upload, start + timedelta(milliseconds=2 * i))
+            for i, (app, download, upload) in enumerate(rows)]
+
+
+def test_group_ticks_splits_on_gaps_between_write_bursts():
+    rows = (burst(START, [("chrome", 100, 10), ("chrome", 200, 20), ("sshd", 5, 1)])
+            + burst(START + timedelta(seconds=1.2), [("chrome", 110, 11), ("chrome", 210, 21)]))
+    ticks = list(group_ticks(rows))
+    assert [timestamp for timestamp, _ in ticks] == [START, START + timedelta(seconds=1.2)]
+    assert ticks[0][1] == {
+        ("chrome", 0): ("chrome", 100, 10),
+        ("chrome", 1): ("chrome", 200, 20),
+        ("sshd", 0): ("sshd", 5, 1)
+    }
+    assert ticks[1][1] == {("chrome", 0): ("chrome", 110, 11), ("chrome", 1): ("chrome", 210, 21)}
+
+
+def test_group_ticks_keeps_a_slow_burst_together():
+    rows = [("chrome", 1, 1, START + timedelta(seconds=0.4 * i)) for i in range(5)]
+    assert len(list(group_ticks(rows))) == 1
+
+
+def test_iter_csv_ticks_reads_exported_reports(tmp_path):
+    path = tmp_path / "report.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Application", "Timestamp", "Download (MB)", "Upload (MB)"])
+        writer.writerow(["chrome", str(START), 2, 1])
+        writer.writerow(["chrome", str(START + timedelta(seconds=2)), 3, 1])
+    ticks = list(iter_csv_ticks(path))
+    assert len(ticks) == 2
+    assert ticks[1][1] == {("chrome", 0): ("chrome", 3 * 1024 * 1024, 1024 * 1024)}
@@ -0,0 +1,80 @@
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+for module in ("PyQt6", "psutil", "matplotlib", "pandas", "qdarkstyle"):
+    pytest.importorskip(module)
+
+os.environ.setdefault("BANDWIDTHBUDDY_DATA_DIR", tempfile.mkdtemp())
+
+from BandwidthBuddy import TrafficAnalyzer
+
+
+def run_ticks(analyzer, rates, ticks, start=datetime(2026, 1, 1, 12)):
+    # rates(tick, app_index) -> bytes/s; returns anomalous apps per tick
+    totals = {}
+    previous = {}
+    flagged = []
+    for tick in range(ticks):
+        current = {}
+        for index in range(rates.apps):
+            app = f"app{index}"
+            totals[app] = totals.get(app, 0) + rates(tick, index)
+            current[index] = (app, totals[app], 0)
+        analyzer.observe(previous, current, start + timedelta(seconds=tick))
+        previous = current
+        flagged.append(analyzer.anomalous_apps())
+    return flagged
+
+
+class Rates:
+    def __init__(self, apps, quiet_app, spike_at, spike_rate=5 * 1024 * 1024):
+        self.apps = apps
+        self.quiet_app = quiet_app
+        self.spike_at = spike_at
+        self.spike_rate = spike_rate
+
+    def __call__(self, tick, index):
+        if index == self.quiet_app:
+            return self.spike_rate if tick >= self.spike_at else 0
+        return 10 * 1024 + (tick * 7 + index * 13) % 2048
+
+
+def test_quiet_app_spike_is_flagged():
+    flagged = run_ticks(TrafficAnalyzer(), Rates(apps=21, quiet_app=20, spike_at=100), 200)
+    assert not any(flagged[:100])
+    assert "app20" in flagged[100]
+
+
+def test_quiet_app_spike_is_flagged_with_more_apps_than_capacity():
+    flagged = run_ticks(TrafficAnalyzer(capacity=8), Rates(apps=40, quiet_app=39, spike_at=100), 200)
+    assert "app39" in flagged[100]
+
+
+def test_baselines_stay_bounded_by_capacity():
+    analyzer = TrafficAnalyzer(capacity=8)
+    run_ticks(analyzer, Rates(apps=40, quiet_app=39, spike_at=100), 150)
+    assert len(analyzer.baselines) <= 8
+
+
+def test_process_count_change_is_not_traffic():
+    # Every process reports the whole NIC counter, as monitor_bandwidth does
+    analyzer = TrafficAnalyzer()
+    nic_counter = 50 * 1024 ** 3
+    previous = {}
+    start = datetime(2026, 1, 1, 12)
+    for tick in range(200):
+        nic_counter += 20 * 1024
+        processes = 4 if 100 <= tick < 150 else 3
+        current = {pid: ("chrome", nic_counter, 0) for pid in range(processes)}
+        current[1000] = ("sshd", 1000 * tick, 0)
+        deltas = analyzer.observe(previous, current, start + timedelta(seconds=tick))
+        previous = current
+        if tick > 0:
+            assert deltas["chrome"][0] <= processes * 20 * 1024
+        if "chrome" in analyzer.baselines:
+            assert analyzer.baselines["chrome"]["mean"] < 100 * 1024
+        if tick == 100:
+            assert "chrome" not in analyzer.anomalous_apps()